@@ -1,8 +1,17 @@
 
+import io
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import math
+import numpy as np
+from numba import njit
+import altair as alt
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# SKU column order shared by the demand matrix, inventory and shipment arrays;
+# NR/ND/SR/SD are the matching positions in the length-4 per-week arrays
+SKUS = ["North_Regular","North_Diet","South_Regular","South_Diet"]
+NR, ND, SR, SD = 0, 1, 2, 3
 
 st.set_page_config(page_title="Cola Company Simulation", layout="wide")
 st.title("🥤 Cola Company Distribution Simulation")
@@ -21,10 +30,16 @@ SAFETY_STOCK   = st.sidebar.number_input("Safety Stock (per SKU per DC)", value=
 # ===============================
 # 2. Load Dataset
 # ===============================
+@st.cache_data(ttl=24*60*60)
+def load_demand(file_bytes):
+    return pd.read_csv(io.BytesIO(file_bytes))
+
 if uploaded_file:
-    df = pd.read_csv(uploaded_file)
+    df = load_demand(uploaded_file.getvalue())
     st.subheader("📊 Uploaded Demand Dataset")
-    st.dataframe(df)
+    st.dataframe(df.head(100))
+    if len(df) > 100:
+        st.caption(f"Showing the first 100 of {len(df)} weeks.")
 else:
     st.warning("⚠️ Please upload a CSV with columns: Week, North_Regular, North_Diet, South_Regular, South_Diet")
     st.stop()
@@ -32,100 +47,139 @@ else:
 # ===============================
 # 3. Simulation Function
 # ===============================
-def simulate_week(row, starting_inv, capacity=PLANT_CAPACITY):
-    demand = {
-        "North_Regular": row["North_Regular"],
-        "North_Diet": row["North_Diet"],
-        "South_Regular": row["South_Regular"],
-        "South_Diet": row["South_Diet"]
-    }
+# --- helper function: split truck total into multiples of 1000 ---
+@njit(cache=True)
+def split_into_skus(req_reg, req_diet, truck_total):
+    # proportional split, rounded to the nearest 1000; kept as the original float expression
+    # because exact ties like 15/22 * 11000 / 1000 land just below .5 in floating point
+    req_sum = req_reg + req_diet
+    if req_sum == 0:
+        return 0, 0
+    reg_alloc = int(round(req_reg / req_sum * truck_total / 1000)) * 1000
+    # clamp, then floor: truck_total is only a multiple of 1000 when the truck size is
+    reg_alloc = min(max(reg_alloc, 0), truck_total) // 1000 * 1000
+    return reg_alloc, truck_total - reg_alloc
+
+
+@njit(cache=True)
+def simulate_week(nr, nd, sr, sd, starting_inv, capacity, truck_size, safety_stock):
+    # nr/nd/sr/sd are this week's demand; starting_inv is a length-4 int array in SKUS order
+    demand = np.array([nr, nd, sr, sd], dtype=np.int64)
 
     # Step 1: Required demand + safety stock
-    required = {k: max(0, demand[k] + SAFETY_STOCK - starting_inv.get(k, SAFETY_STOCK))
-                for k in demand}
-    total_required = sum(required.values())
+    required = np.maximum(0, demand + safety_stock - starting_inv)
+    total_required = int(required.sum())
 
     # Step 2: Scale if capacity exceeded (proportional)
     if total_required > capacity:
-        alloc = {k: int(required[k] * capacity / total_required) for k in required}
+        alloc = required * capacity // total_required
     else:
         alloc = required
 
-    # --- helper function: split truck total into multiples of 1000 ---
-    def split_into_skus(req_reg, req_diet, truck_total):
-        if truck_total == 0:
-            return 0, 0
-
-        # proportional split first
-        reg_share = req_reg / (req_reg + req_diet) if (req_reg + req_diet) > 0 else 0.5
-        reg_alloc = int(round(reg_share * truck_total / 1000)) * 1000
-        diet_alloc = truck_total - reg_alloc
-
-        # correct rounding issues
-        if diet_alloc < 0:
-            diet_alloc = 0
-            reg_alloc = truck_total
-        if reg_alloc < 0:
-            reg_alloc = 0
-            diet_alloc = truck_total
-
-        # ensure multiples of 1000
-        reg_alloc = (reg_alloc // 1000) * 1000
-        diet_alloc = truck_total - reg_alloc
-        return reg_alloc, diet_alloc
-
     # Step 3: Group by DC totals (truck constraint)
-    north_total = alloc["North_Regular"] + alloc["North_Diet"]
-    south_total = alloc["South_Regular"] + alloc["South_Diet"]
-
-    north_truck_total = math.floor(north_total / TRUCK_SIZE) * TRUCK_SIZE
-    south_truck_total = math.floor(south_total / TRUCK_SIZE) * TRUCK_SIZE
+    north_truck_total = (alloc[NR] + alloc[ND]) // truck_size * truck_size
+    south_truck_total = (alloc[SR] + alloc[SD]) // truck_size * truck_size
 
     # Step 4: Split back into SKUs, ensuring multiples of 1000
-    n_reg, n_diet = split_into_skus(alloc["North_Regular"], alloc["North_Diet"], north_truck_total)
-    s_reg, s_diet = split_into_skus(alloc["South_Regular"], alloc["South_Diet"], south_truck_total)
-
-    alloc_truck = {
-        "North_Regular": n_reg,
-        "North_Diet": n_diet,
-        "South_Regular": s_reg,
-        "South_Diet": s_diet
-    }
+    alloc_truck = np.empty(4, dtype=np.int64)
+    alloc_truck[NR], alloc_truck[ND] = split_into_skus(alloc[NR], alloc[ND], north_truck_total)
+    alloc_truck[SR], alloc_truck[SD] = split_into_skus(alloc[SR], alloc[SD], south_truck_total)
 
     # Step 5: Update inventories (never negative)
-    ending_inv = {
-        k: max(0, starting_inv.get(k, SAFETY_STOCK) + alloc_truck[k] - demand[k]) 
-        for k in demand
-    }
-
-    # Step 6: Fulfillment
-    fulfilled = {k: min(demand[k], alloc_truck[k]) for k in demand}
-    fulfillment_pct = sum(fulfilled.values()) / sum(demand.values()) * 100
-
-    return alloc_truck, ending_inv, fulfilled, fulfillment_pct, total_required
+    ending_inv = np.maximum(0, starting_inv + alloc_truck - demand)
+
+    return alloc_truck, ending_inv
+
+
+# compile the kernel up front so the first "Run Simulation" click doesn't pay the JIT cost
+simulate_week(0, 0, 0, 0, np.zeros(4, dtype=np.int64), 1, 1, 0)
+
+
+@st.cache_data(show_spinner=False)
+def run_sim(df, capacity, truck_size, safety_stock):
+    D = df[SKUS].to_numpy(dtype=np.int64)
+    weeks = df["Week"].to_numpy()
+    nr_col, nd_col, sr_col, sd_col = D.T.tolist()
+    demand_totals = D.sum(axis=1)
+    inventory = np.full(4, safety_stock, dtype=np.int64)
+
+    # per-week shipments / ending inventories, filled by row and framed once after the loop
+    ship_out = np.empty((len(D), 4), dtype=np.int64)
+    inv_out = np.empty((len(D), 4), dtype=np.int64)
+    # repeated (demand, starting inventory) states reuse the kernel's earlier result for this run;
+    # a state can only repeat if a demand row does, so skip the lookups when none are duplicated.
+    # Capped at 4096 states; once full, existing entries still hit but new ones aren't stored
+    seen = {} if df.duplicated(subset=SKUS).any() else None
+    for i, (nr, nd, sr, sd) in enumerate(zip(nr_col, nd_col, sr_col, sd_col)):
+        if seen is None:
+            step = simulate_week(nr, nd, sr, sd, inventory, capacity, truck_size, safety_stock)
+        else:
+            key = (nr, nd, sr, sd, inventory.tobytes())
+            step = seen.get(key)
+            if step is None:
+                step = simulate_week(nr, nd, sr, sd, inventory, capacity, truck_size, safety_stock)
+                if len(seen) < 4096:
+                    seen[key] = step
+        ship_out[i], inventory = step
+        inv_out[i] = inventory
+
+    sim_df = pd.DataFrame(ship_out, columns=SKUS)
+    sim_df.insert(0, "Week", weeks)
+    sim_df["Total_Production"] = ship_out.sum(axis=1)
+    sim_df["Total_Demand"] = demand_totals
+    sim_df["Fulfillment %"] = (np.minimum(D, ship_out).sum(axis=1) / demand_totals * 100).round(2)
+    sim_df["Capacity_Utilization"] = sim_df["Total_Production"] / capacity * 100
+    # each DC ships whole trucks, so floor-div is exact
+    sim_df["Trucks_Used"] = (ship_out[:, NR] + ship_out[:, ND]) // truck_size \
+                            + (ship_out[:, SR] + ship_out[:, SD]) // truck_size
+
+    # SKU / DC totals shared by the production split and shipment charts
+    sim_df["Regular_Total"] = sim_df["North_Regular"] + sim_df["South_Regular"]
+    sim_df["Diet_Total"] = sim_df["North_Diet"] + sim_df["South_Diet"]
+    sim_df["North_Total"] = sim_df["North_Regular"] + sim_df["North_Diet"]
+    sim_df["South_Total"] = sim_df["South_Regular"] + sim_df["South_Diet"]
+
+    inv_df = pd.DataFrame(inv_out, columns=SKUS)
+    inv_df.insert(0, "Week", weeks)
+    return sim_df, inv_df
+
+
+# --- chart helper: cached so unchanged results don't rebuild their Altair specs on reruns ---
+@st.cache_data(show_spinner=False)
+def plot_chart(data, series, title, ylabel, kind="line", colors=None,
+               rule=None, rule_label=None, y_domain=None):
+    # series maps column -> legend label; data is melted to long form so one spec covers all series
+    long_df = data.rename(columns=series).melt(id_vars="Week", value_vars=list(series.values()),
+                                               var_name="Series", value_name="Value")
+    color = alt.Color("Series:N", title=None,
+                      scale=alt.Scale(range=colors) if colors else alt.Undefined,
+                      legend=alt.Legend(orient="bottom") if len(series) > 1 else None)
+    y = alt.Y("Value:Q", title=ylabel, stack="zero" if kind == "bar" else None,
+              scale=alt.Scale(domain=y_domain) if y_domain else alt.Undefined)
+    # numeric weeks get a continuous axis for lines; labels like "W1" are ordinal, kept in file order
+    numeric_weeks = pd.api.types.is_numeric_dtype(data["Week"])
+    x = alt.X("Week:Q" if numeric_weeks and kind != "bar" else "Week:O", title="Week",
+              sort=alt.Undefined if numeric_weeks else None)
+    base = alt.Chart(long_df)
+    if kind == "bar":
+        chart = base.mark_bar().encode(x=x, y=y, color=color)
+    else:
+        chart = base.mark_line(point=True).encode(x=x, y=y, color=color)
+        if kind == "area":
+            chart = base.mark_area(opacity=0.2).encode(x=x, y=y, color=color) + chart
+    if rule is not None:
+        rule_df = pd.DataFrame({"Value": [rule], "Label": [rule_label]})
+        rule_base = alt.Chart(rule_df).encode(y="Value:Q")
+        chart += rule_base.mark_rule(color="red", strokeDash=[6, 4]) \
+                 + rule_base.mark_text(color="red", align="left", dy=-6).encode(text="Label:N")
+    return chart.properties(title=title) if title else chart
 
 
 # ===============================
 # 4. Run Simulation
 # ===============================
 if st.sidebar.button("▶️ Run Simulation"):
-    results = []
-    inventory = {k: SAFETY_STOCK for k in ["North_Regular","North_Diet","South_Regular","South_Diet"]}
-
-    for _, row in df.iterrows():
-        shipments, inventory, fulfilled, fulfil, total_req = simulate_week(row, inventory)
-        results.append({
-            "Week": row["Week"],
-            **shipments,
-            "Total_Production": sum(shipments.values()),
-            "Total_Demand": sum([row[c] for c in ["North_Regular","North_Diet","South_Regular","South_Diet"]]),
-            "Fulfillment %": round(fulfil,2),
-            "Capacity_Utilization": sum(shipments.values()) / PLANT_CAPACITY * 100,
-            "Trucks_Used": (shipments["North_Regular"]+shipments["North_Diet"]) / TRUCK_SIZE
-                           + (shipments["South_Regular"]+shipments["South_Diet"]) / TRUCK_SIZE
-        })
-
-    sim_df = pd.DataFrame(results)
+    sim_df, inv_df = run_sim(df, PLANT_CAPACITY, TRUCK_SIZE, SAFETY_STOCK)
 
     # ===============================
     # 5. KPIs
@@ -140,106 +194,63 @@ if st.sidebar.button("▶️ Run Simulation"):
     # 6. Results Table + Download
     # ===============================
     st.subheader("📋 Simulation Results")
-    st.dataframe(sim_df)
+    # fixed height keeps the table windowed client-side; the full table is in the CSV download
+    st.dataframe(sim_df, width="stretch", height=400)
 
-    csv = sim_df.to_csv(index=False).encode("utf-8")
+    # pyarrow's C++ CSV writer instead of pandas' Python one
+    buf = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(sim_df, preserve_index=False), buf)
+    csv = buf.getvalue()
     st.download_button("⬇️ Download Results (CSV)", data=csv, file_name="simulation_results.csv", mime="text/csv")
 
     # ===============================
     # 7. Charts
     # ===============================
-    def plot_chart(x, y, title, xlabel, ylabel, kind="line", color=None, legend_label=None):
-        fig, ax = plt.subplots()
-        if kind == "line":
-            ax.plot(x, y, marker="o", color=color, label=legend_label)
-        elif kind == "bar":
-            ax.bar(x, y, color=color, label=legend_label)
-        ax.set_title(title); ax.set_xlabel(xlabel); ax.set_ylabel(ylabel)
-        if legend_label: ax.legend()
-        st.pyplot(fig)
-
     st.subheader("📈 Visualizations")
 
     # Demand vs Production
-    fig, ax = plt.subplots()
-    ax.plot(sim_df["Week"], sim_df["Total_Demand"], label="Total Demand", marker="o")
-    ax.plot(sim_df["Week"], sim_df["Total_Production"], label="Total Production", marker="s")
-    ax.axhline(PLANT_CAPACITY, color="r", linestyle="--", label="Plant Capacity")
-    ax.set_title("Total Demand vs Production")
-    ax.set_xlabel("Week"); ax.set_ylabel("Bottles")
-    ax.legend(); ax.grid(True)
-    st.pyplot(fig)
+    st.altair_chart(plot_chart(sim_df, {"Total_Demand": "Total Demand", "Total_Production": "Total Production"},
+                               "Total Demand vs Production", "Bottles",
+                               rule=PLANT_CAPACITY, rule_label="Plant Capacity"), width="stretch")
 
     # Fulfillment %
-    plot_chart(sim_df["Week"], sim_df["Fulfillment %"], "Fulfillment % by Week", "Week", "%", kind="line", color="green")
+    st.altair_chart(plot_chart(sim_df, {"Fulfillment %": "Fulfillment %"}, "Fulfillment % by Week", "%",
+                               colors=["green"]), width="stretch")
 
     # Capacity Utilization
-    plot_chart(sim_df["Week"], sim_df["Capacity_Utilization"], "Plant Capacity Utilization %", "Week", "%", kind="bar", color="skyblue")
+    st.altair_chart(plot_chart(sim_df, {"Capacity_Utilization": "Capacity Utilization"},
+                               "Plant Capacity Utilization %", "%", kind="bar", colors=["skyblue"]), width="stretch")
 
     # Trucks Used
-    plot_chart(sim_df["Week"], sim_df["Trucks_Used"], "Trucks Used per Week", "Week", "Trucks", kind="line", color="purple")
-    
-
+    st.altair_chart(plot_chart(sim_df, {"Trucks_Used": "Trucks Used"}, "Trucks Used per Week", "Trucks",
+                               colors=["purple"]), width="stretch")
 
         # =========================================================================================
     # Production Split (Regular vs Diet)
     st.subheader("🥤 Production Split (Regular vs Diet)")
-    fig, ax = plt.subplots()
-    ax.bar(sim_df["Week"], sim_df["North_Regular"] + sim_df["South_Regular"], 
-           label="Regular Cola")
-    ax.bar(sim_df["Week"], sim_df["North_Diet"] + sim_df["South_Diet"], 
-           bottom=sim_df["North_Regular"] + sim_df["South_Regular"], label="Diet Cola")
-    ax.set_title("Production Split by SKU")
-    ax.set_xlabel("Week"); ax.set_ylabel("Bottles")
-    ax.legend()
-    st.pyplot(fig)
+    st.altair_chart(plot_chart(sim_df, {"Regular_Total": "Regular Cola", "Diet_Total": "Diet Cola"},
+                               "Production Split by SKU", "Bottles", kind="bar"), width="stretch")
 
     # =========================================================================================
     # Fulfillment % (Line + Area Chart)
     st.subheader("✅ Fulfillment % by Week")
-    fig, ax = plt.subplots()
-    ax.plot(sim_df["Week"], sim_df["Fulfillment %"], marker="o", color="green", label="Fulfillment %")
-    ax.fill_between(sim_df["Week"], sim_df["Fulfillment %"], color="green", alpha=0.2)
-    ax.axhline(100, color="red", linestyle="--", label="Target = 100%")
-    ax.set_ylim(0, 110)
-    ax.set_xlabel("Week"); ax.set_ylabel("%")
-    ax.legend(); ax.grid(True)
-    st.pyplot(fig)
+    st.altair_chart(plot_chart(sim_df, {"Fulfillment %": "Fulfillment %"}, None, "%", kind="area",
+                               colors=["green"], rule=100, rule_label="Target = 100%", y_domain=[0, 110]),
+                    width="stretch")
 
     # =========================================================================================
     # Shipments to Distribution Centers
     st.subheader("🚚 Shipments to Distribution Centers")
-    fig, ax = plt.subplots()
-    ax.bar(sim_df["Week"], sim_df["North_Regular"] + sim_df["North_Diet"], label="North DC")
-    ax.bar(sim_df["Week"], sim_df["South_Regular"] + sim_df["South_Diet"], 
-           bottom=sim_df["North_Regular"] + sim_df["North_Diet"], label="South DC")
-    ax.set_title("Shipments to North vs South DC")
-    ax.set_xlabel("Week"); ax.set_ylabel("Bottles")
-    ax.legend()
-    st.pyplot(fig)
+    st.altair_chart(plot_chart(sim_df, {"North_Total": "North DC", "South_Total": "South DC"},
+                               "Shipments to North vs South DC", "Bottles", kind="bar"), width="stretch")
 
     # =========================================================================================
     # Inventory Levels per DC & SKU
     st.subheader("📦 Inventory Levels per DC & SKU")
 
-    # Build inventory dataframe across weeks
-    inv_records = []
-    inventory = {k: SAFETY_STOCK for k in ["North_Regular","North_Diet","South_Regular","South_Diet"]}
-
-    for _, row in df.iterrows():
-        shipments, inventory, fulfilled, fulfil, total_req = simulate_week(row, inventory)
-        inv_records.append({"Week": row["Week"], **inventory})
-
-    inv_df = pd.DataFrame(inv_records)
-
-    fig, ax = plt.subplots(figsize=(10,6))
-    for col in ["North_Regular","North_Diet","South_Regular","South_Diet"]:
-        ax.plot(inv_df["Week"], inv_df[col], marker="o", label=col)
-    ax.axhline(SAFETY_STOCK, color="red", linestyle="--", label="Safety Stock Level")
-    ax.set_title("Inventory Levels per DC & SKU")
-    ax.set_xlabel("Week"); ax.set_ylabel("Ending Inventory")
-    ax.legend(); ax.grid(True)
-    st.pyplot(fig)
+    st.altair_chart(plot_chart(inv_df, {c: c for c in SKUS},
+                               "Inventory Levels per DC & SKU", "Ending Inventory",
+                               rule=SAFETY_STOCK, rule_label="Safety Stock Level"), width="stretch")
 
 else:
     st.warning("👈 Upload a CSV, set parameters, and click 'Run Simulation'.")